@@ -2,6 +2,9 @@
 Streamlit application for comparing pure LLM vs RAG-enhanced responses.
 """
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
 from llm_service import LLMService
 from rag_service import RAGService
@@ -17,102 +20,103 @@ st.set_page_config(
 # Initialize services
 @st.cache_resource
 def get_services():
-    """Initialize and cache LLM and RAG services."""
+    """Initialize and cache LLM and RAG services, pre-warming both Ollama
+    models so the first query doesn't pay the model-load penalty."""
     llm_service = LLMService()
     rag_service = RAGService()
+    llm_service.warm_up()
+    rag_service.warm_up()
     return llm_service, rag_service
 
 
-def main():
-    """Main application function."""
-
-    # Header
-    st.title("🚀 Fast Flow Methodologies Q&A")
-    st.markdown("""
-    Compare responses from a **Pure LLM** vs. **RAG-Enhanced LLM** for questions about
-    Fast Flow methodologies (Wardley Mapping, Domain-Driven Design, Team Topologies).
-    """)
+@st.cache_data(ttl=5, show_spinner=False)
+def get_qdrant_status(_rag_service):
+    """Check Qdrant status, cached briefly so widget reruns don't re-hit Qdrant.
 
-    # Initialize services
-    try:
-        llm_service, rag_service = get_services()
-    except Exception as e:
-        st.error(f"Failed to initialize services: {str(e)}")
-        st.stop()
+    The leading underscore tells Streamlit not to hash the service instance.
+    """
+    return _rag_service.check_connection()
 
-    # Sidebar with connection status
-    with st.sidebar:
-        st.header("⚙️ System Status")
-
-        # Check Qdrant connection
-        with st.spinner("Checking Qdrant connection..."):
-            qdrant_status = rag_service.check_connection()
-
-        if qdrant_status["status"] == "connected":
-            if qdrant_status.get("collection_exists"):
-                points_count = qdrant_status['points_count']
-                if points_count > 0:
-                    st.success("✅ Qdrant Connected")
-                    st.info(f"📊 {points_count} chunks loaded")
-                    st.info(f"🔢 Vector size: {qdrant_status['vector_size']}")
-                else:
-                    st.warning("⚠️ Qdrant collection is empty")
-                    st.caption(f"Collection `{rag_service.collection_name}` has no data")
-            else:
-                st.warning("⚠️ Qdrant connected but collection not found")
-                st.caption(f"Expected: `{rag_service.collection_name}`")
-                if qdrant_status.get("available_collections"):
-                    st.caption(f"Available: {', '.join(qdrant_status['available_collections'])}")
-
-            # Show populate button if collection doesn't exist or is empty
-            collection_exists = qdrant_status.get("collection_exists", False)
-            points_count = qdrant_status.get("points_count", 0)
-            show_populate_button = not collection_exists or points_count == 0
-
-            if show_populate_button:
-                st.divider()
-                st.subheader("📥 Data Population")
-
-                if st.button("🚀 Populate Qdrant", type="primary", use_container_width=True):
-                    with st.spinner("Loading data from JSON..."):
-                        st.caption("⏳ This may take a few minutes...")
-
-                        # Call populate_database
-                        result = rag_service.populate_database('/app/data/fast_flow_extracted.json')
-
-                        if result.get("success"):
-                            st.success("✅ Database populated successfully!")
-                            st.info(f"📄 Processed {result['sections_processed']} sections")
-                            st.info(f"🔢 Created {result['chunks_created']} chunks")
-                            st.caption("Refreshing page...")
-
-                            # Clear cache and refresh
-                            st.cache_resource.clear()
-                            st.rerun()
-                        else:
-                            st.error(f"❌ Failed to populate database")
-                            st.caption(f"Error: {result.get('error', 'Unknown error')}")
-        else:
-            st.error("❌ Qdrant connection failed")
-            st.caption(qdrant_status.get("error", "Unknown error"))
 
-        st.divider()
+def _consume_stream(token_stream, buffer):
+    """Drain a token generator into a shared buffer (runs in a worker thread)."""
+    for token in token_stream:
+        buffer.append(token)
 
-        st.header("ℹ️ About")
-        st.markdown("""
-        **Pure LLM**: Direct query to Mistral without additional context.
 
-        **RAG-Enhanced**: Query enriched with relevant sections from the Fast Flow documentation retrieved from Qdrant.
-        """)
+@st.fragment(run_every="30s")
+def sidebar_status(rag_service):
+    """Qdrant status and data population, polled without rerunning the page.
 
-        st.divider()
+    As a fragment this subtree re-renders on its own 30s schedule; typing in
+    the question box or clicking Clear no longer re-issues the health check.
+    """
+    st.header("⚙️ System Status")
 
-        st.header("🔧 Configuration")
-        st.caption(f"Qdrant: {rag_service.qdrant_host}:{rag_service.qdrant_port}")
-        st.caption(f"Ollama: {llm_service.base_url}")
-        st.caption(f"Model: {llm_service.model}")
+    # Check Qdrant connection
+    with st.spinner("Checking Qdrant connection..."):
+        qdrant_status = get_qdrant_status(rag_service)
 
-    # Main input area
+    if qdrant_status["status"] == "connected":
+        if qdrant_status.get("collection_exists"):
+            points_count = qdrant_status['points_count']
+            if points_count > 0:
+                st.success("✅ Qdrant Connected")
+                st.info(f"📊 {points_count} chunks loaded")
+                st.info(f"🔢 Vector size: {qdrant_status['vector_size']}")
+            else:
+                st.warning("⚠️ Qdrant collection is empty")
+                st.caption(f"Collection `{rag_service.collection_name}` has no data")
+        else:
+            st.warning("⚠️ Qdrant connected but collection not found")
+            st.caption(f"Expected: `{rag_service.collection_name}`")
+            if qdrant_status.get("available_collections"):
+                st.caption(f"Available: {', '.join(qdrant_status['available_collections'])}")
+
+        # Show populate button if collection doesn't exist or is empty
+        collection_exists = qdrant_status.get("collection_exists", False)
+        points_count = qdrant_status.get("points_count", 0)
+        show_populate_button = not collection_exists or points_count == 0
+
+        if show_populate_button:
+            st.divider()
+            st.subheader("📥 Data Population")
+
+            if st.button("🚀 Populate Qdrant", type="primary", use_container_width=True):
+                with st.spinner("Loading data from JSON..."):
+                    st.caption("⏳ This may take a few minutes...")
+
+                    # Call populate_database
+                    result = rag_service.populate_database('/app/data/fast_flow_extracted.json')
+
+                    if result.get("success"):
+                        st.success("✅ Database populated successfully!")
+                        st.info(f"📄 Processed {result['sections_processed']} sections")
+                        st.info(f"🔢 Created {result['chunks_created']} chunks")
+                        st.caption("Refreshing page...")
+
+                        # Clear caches and refresh the whole app: the status
+                        # cache would otherwise show stale counts until its
+                        # TTL expires, and the other fragments need to see
+                        # the repopulated collection
+                        get_qdrant_status.clear()
+                        st.cache_resource.clear()
+                        st.rerun(scope="app")
+                    else:
+                        st.error(f"❌ Failed to populate database")
+                        st.caption(f"Error: {result.get('error', 'Unknown error')}")
+    else:
+        st.error("❌ Qdrant connection failed")
+        st.caption(qdrant_status.get("error", "Unknown error"))
+
+
+@st.fragment
+def qa_fragment(llm_service, rag_service):
+    """Question input and the side-by-side responses.
+
+    As a fragment, submitting or clearing reruns only this subtree instead of
+    the whole script, so the sidebar isn't re-rendered per interaction.
+    """
     st.header("💬 Ask a Question")
 
     question = st.text_area(
@@ -130,7 +134,7 @@ def main():
         clear_button = st.button("🗑️ Clear", use_container_width=True)
 
     if clear_button:
-        st.rerun()
+        st.rerun(scope="fragment")
 
     # Process query
     if submit_button and question.strip():
@@ -141,35 +145,109 @@ def main():
 
         with col_pure:
             st.subheader("💭 Pure LLM Response")
-            with st.spinner("Generating pure LLM response..."):
-                try:
-                    pure_response = llm_service.query_pure(question)
-                    st.markdown(pure_response)
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+            pure_placeholder = st.empty()
 
         with col_rag:
             st.subheader("🎯 RAG-Enhanced Response")
+            context_placeholder = st.empty()
+            rag_placeholder = st.empty()
+
+        # Run the pure query and context retrieval concurrently (both are
+        # I/O-bound HTTP calls to Ollama/Qdrant); chain the RAG query as soon
+        # as the context is available. The worker threads only append tokens
+        # to plain lists; all Streamlit rendering happens in the main thread.
+        pure_tokens = []
+        rag_tokens = []
+        context = None
+
+        try:
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                pure_future = executor.submit(
+                    _consume_stream,
+                    llm_service.query_pure_stream(question),
+                    pure_tokens
+                )
+                context_future = executor.submit(
+                    rag_service.retrieve_context, question
+                )
+
+                rag_future = None
+                while True:
+                    if rag_future is None and context_future.done():
+                        context = context_future.result()
+                        rag_future = executor.submit(
+                            _consume_stream,
+                            llm_service.query_rag_stream(question, context),
+                            rag_tokens
+                        )
+
+                    if pure_tokens:
+                        pure_placeholder.markdown("".join(pure_tokens))
+                    if rag_tokens:
+                        rag_placeholder.markdown("".join(rag_tokens))
+
+                    if pure_future.done() and rag_future is not None and rag_future.done():
+                        break
+                    time.sleep(0.05)
+
+                # Surface any exception raised inside the workers
+                pure_future.result()
+                rag_future.result()
+
+            # Final render once both streams are complete
+            pure_placeholder.markdown("".join(pure_tokens))
+            rag_placeholder.markdown("".join(rag_tokens))
+
+            with context_placeholder.container():
+                with st.expander("📚 Retrieved Context", expanded=False):
+                    st.text(context)
+
+        except Exception as e:
+            st.error(f"Error: {str(e)}")
 
-            # First, retrieve context
-            with st.spinner("Retrieving relevant context..."):
-                try:
-                    context = rag_service.retrieve_context(question)
+    elif submit_button:
+        st.warning("Please enter a question first.")
 
-                    # Show retrieved context in expander
-                    with st.expander("📚 Retrieved Context", expanded=False):
-                        st.text(context)
 
-                    # Generate RAG response
-                    with st.spinner("Generating RAG-enhanced response..."):
-                        rag_response = llm_service.query_rag(question, context)
-                        st.markdown(rag_response)
+def main():
+    """Main application function."""
 
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+    # Header
+    st.title("🚀 Fast Flow Methodologies Q&A")
+    st.markdown("""
+    Compare responses from a **Pure LLM** vs. **RAG-Enhanced LLM** for questions about
+    Fast Flow methodologies (Wardley Mapping, Domain-Driven Design, Team Topologies).
+    """)
 
-    elif submit_button:
-        st.warning("Please enter a question first.")
+    # Initialize services
+    try:
+        llm_service, rag_service = get_services()
+    except Exception as e:
+        st.error(f"Failed to initialize services: {str(e)}")
+        st.stop()
+
+    # Sidebar with connection status
+    with st.sidebar:
+        sidebar_status(rag_service)
+
+        st.divider()
+
+        st.header("ℹ️ About")
+        st.markdown("""
+        **Pure LLM**: Direct query to Mistral without additional context.
+
+        **RAG-Enhanced**: Query enriched with relevant sections from the Fast Flow documentation retrieved from Qdrant.
+        """)
+
+        st.divider()
+
+        st.header("🔧 Configuration")
+        st.caption(f"Qdrant: {rag_service.qdrant_host}:{rag_service.qdrant_port}")
+        st.caption(f"Ollama: {llm_service.base_url}")
+        st.caption(f"Model: {llm_service.model}")
+
+    # Main Q&A area (fragment: interactions rerun only this subtree)
+    qa_fragment(llm_service, rag_service)
 
     # Footer
     st.divider()
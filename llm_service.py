@@ -4,8 +4,11 @@ Provides both pure and RAG-enhanced query capabilities.
 """
 
 import os
+import json
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Iterator, Optional
 
 
 class LLMService:
@@ -14,7 +17,9 @@ class LLMService:
     def __init__(
         self,
         base_url: Optional[str] = None,
-        model: str = "mistral"
+        model: str = "mistral",
+        num_ctx: Optional[int] = None,
+        keep_alive: str = "30m"
     ):
         """
         Initialize LLM service.
@@ -22,14 +27,48 @@ class LLMService:
         Args:
             base_url: Ollama API base URL (default: http://host.docker.internal:11434)
             model: Model name to use (default: mistral)
+            num_ctx: Context window size passed to Ollama (default: model's default)
+            keep_alive: How long Ollama keeps the model loaded between requests
         """
         self.base_url = base_url or os.getenv(
             "OLLAMA_BASE_URL",
             "http://host.docker.internal:11434"
         )
         self.model = model
+        env_num_ctx = os.getenv("OLLAMA_NUM_CTX")
+        self.num_ctx = num_ctx or (int(env_num_ctx) if env_num_ctx else None)
+        self.keep_alive = keep_alive
         self.api_url = f"{self.base_url}/api/generate"
 
+        # Pooled session with keep-alive: avoids paying TCP connection setup
+        # on every call (noticeable across the Docker NAT to host.docker.internal)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504]
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def warm_up(self) -> None:
+        """
+        Force-load the model into Ollama's memory and pin it via keep_alive,
+        so the first real query doesn't pay the model-load penalty.
+        """
+        try:
+            self.session.post(
+                self.api_url,
+                json=self._build_payload("", stream=False),
+                timeout=120
+            )
+        except requests.exceptions.RequestException:
+            pass  # Ollama not reachable yet; first query will load the model
+
     def query_pure(self, question: str) -> str:
         """
         Send a pure question to the LLM without any additional context.
@@ -40,13 +79,19 @@ class LLMService:
         Returns:
             LLM's response
         """
-        prompt = f"""You are an expert in Fast Flow methodologies including Wardley Mapping, Domain-Driven Design (DDD), and Team Topologies.
+        return self._generate_full(self._build_pure_prompt(question))
 
-User Question: {question}
+    def query_pure_stream(self, question: str) -> Iterator[str]:
+        """
+        Stream a pure question to the LLM without any additional context.
 
-Please provide a helpful and accurate answer based on your knowledge."""
+        Args:
+            question: User's question
 
-        return self._generate(prompt)
+        Yields:
+            Response tokens as they are generated
+        """
+        return self._generate(self._build_pure_prompt(question))
 
     def query_rag(self, question: str, context: str) -> str:
         """
@@ -59,7 +104,32 @@ Please provide a helpful and accurate answer based on your knowledge."""
         Returns:
             LLM's response enhanced with context
         """
-        prompt = f"""You are an expert in Fast Flow methodologies including Wardley Mapping, Domain-Driven Design (DDD), and Team Topologies.
+        return self._generate_full(self._build_rag_prompt(question, context))
+
+    def query_rag_stream(self, question: str, context: str) -> Iterator[str]:
+        """
+        Stream a question to the LLM with retrieved context (RAG approach).
+
+        Args:
+            question: User's question
+            context: Retrieved context from vector database
+
+        Yields:
+            Response tokens as they are generated
+        """
+        return self._generate(self._build_rag_prompt(question, context))
+
+    def _build_pure_prompt(self, question: str) -> str:
+        """Build the prompt for a pure (context-free) query."""
+        return f"""You are an expert in Fast Flow methodologies including Wardley Mapping, Domain-Driven Design (DDD), and Team Topologies.
+
+User Question: {question}
+
+Please provide a helpful and accurate answer based on your knowledge."""
+
+    def _build_rag_prompt(self, question: str, context: str) -> str:
+        """Build the prompt for a RAG query with retrieved context."""
+        return f"""You are an expert in Fast Flow methodologies including Wardley Mapping, Domain-Driven Design (DDD), and Team Topologies.
 
 Use the following context from the Fast Flow documentation to answer the user's question. If the context is relevant, incorporate it into your answer. If the context doesn't fully answer the question, you can supplement with your general knowledge but prioritize the provided context.
 
@@ -70,11 +140,55 @@ User Question: {question}
 
 Please provide a helpful and accurate answer."""
 
-        return self._generate(prompt)
+    def _build_payload(self, prompt: str, stream: bool) -> dict:
+        """Build the Ollama request payload, including optional generation options."""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive
+        }
+        if self.num_ctx:
+            payload["options"] = {"num_ctx": self.num_ctx}
+        return payload
+
+    def _generate(self, prompt: str) -> Iterator[str]:
+        """
+        Internal method to stream a response from Ollama token by token.
 
-    def _generate(self, prompt: str) -> str:
+        Args:
+            prompt: Complete prompt to send to LLM
+
+        Yields:
+            Response tokens as Ollama produces them
+        """
+        try:
+            with self.session.post(
+                self.api_url,
+                json=self._build_payload(prompt, stream=True),
+                stream=True,
+                timeout=60
+            ) as response:
+                response.raise_for_status()
+
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        break
+
+        except requests.exceptions.RequestException as e:
+            yield f"Error communicating with LLM: {str(e)}"
+        except Exception as e:
+            yield f"Unexpected error: {str(e)}"
+
+    def _generate_full(self, prompt: str) -> str:
         """
-        Internal method to generate response from Ollama.
+        Internal method to generate a complete (non-streaming) response from Ollama.
 
         Args:
             prompt: Complete prompt to send to LLM
@@ -83,15 +197,9 @@ Please provide a helpful and accurate answer."""
             Generated response
         """
         try:
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False
-            }
-
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
-                json=payload,
+                json=self._build_payload(prompt, stream=False),
                 timeout=60
             )
             response.raise_for_status()
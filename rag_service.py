@@ -3,13 +3,31 @@ RAG Service for retrieving relevant context from Qdrant vector database.
 """
 
 import os
-import json
+import queue
+import pickle
+import asyncio
+import hashlib
+import functools
+import threading
 from typing import List, Dict, Optional
-from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+)
 from llama_index.embeddings.ollama import OllamaEmbedding
-from llama_index.core import Document
-from llama_index.core.node_parser import SemanticSplitterNodeParser
+
+# Document, the node parsers and ijson are imported lazily inside
+# populate_database: they are only needed for the once-per-click ingest path
+# and llama_index.core in particular adds seconds to Streamlit cold start
 
 
 class RAGService:
@@ -19,39 +37,114 @@ class RAGService:
         self,
         qdrant_host: Optional[str] = None,
         qdrant_port: Optional[int] = None,
+        qdrant_grpc_port: Optional[int] = None,
         ollama_base_url: Optional[str] = None,
         collection_name: str = "fast_flow",
-        top_k: int = 3
+        top_k: int = 3,
+        hnsw_ef: Optional[int] = None,
+        max_chars_per_chunk: int = 1200,
+        embedding_cache_path: Optional[str] = None,
+        use_semantic_chunking: bool = False
     ):
         """
         Initialize RAG service.
 
         Args:
             qdrant_host: Qdrant host (default: localhost)
-            qdrant_port: Qdrant port (default: 6333)
+            qdrant_port: Qdrant REST port (default: 6333)
+            qdrant_grpc_port: Qdrant gRPC port (default: 6334)
             ollama_base_url: Ollama base URL for embeddings (default: http://host.docker.internal:11434)
             collection_name: Qdrant collection name (default: fast_flow)
             top_k: Number of top results to retrieve (default: 3)
+            hnsw_ef: Search-time HNSW beam width; search cost scales with it,
+                and the collection default over-searches for top_k=3 (default: 64)
+            max_chars_per_chunk: Char budget per chunk in the LLM context;
+                prompt size drives time-to-first-token (default: 1200)
+            embedding_cache_path: Where to persist chunk embeddings between
+                populate runs (default: data/embedding_cache.pkl)
+            use_semantic_chunking: Split long sections with the semantic
+                splitter during ingest; it embeds every sentence-boundary
+                candidate, so it's off by default (default: False)
         """
         self.qdrant_host = qdrant_host or os.getenv("QDRANT_HOST", "host.docker.internal")
         self.qdrant_port = qdrant_port or int(os.getenv("QDRANT_PORT", "6333"))
+        self.qdrant_grpc_port = qdrant_grpc_port or int(os.getenv("QDRANT_GRPC_PORT", "6334"))
         self.ollama_base_url = ollama_base_url or os.getenv(
             "OLLAMA_BASE_URL",
             "http://host.docker.internal:11434"
         )
         self.collection_name = collection_name
         self.top_k = top_k
+        self.hnsw_ef = hnsw_ef or int(os.getenv("QDRANT_HNSW_EF", "64"))
+        self.max_chars_per_chunk = max_chars_per_chunk
+        self.embedding_cache_path = embedding_cache_path or os.getenv(
+            "EMBEDDING_CACHE_PATH",
+            "data/embedding_cache.pkl"
+        )
+        self.use_semantic_chunking = use_semantic_chunking
 
-        # Initialize Qdrant client
+        # Initialize Qdrant client. gRPC avoids serializing the 768-dim query
+        # vector as JSON on every search and multiplexes requests over one
+        # HTTP/2 connection; the REST port is kept for anything gRPC can't serve.
         self.qdrant_client = QdrantClient(
             host=self.qdrant_host,
-            port=self.qdrant_port
+            port=self.qdrant_port,
+            grpc_port=self.qdrant_grpc_port,
+            prefer_grpc=True
         )
 
-        # Initialize embedding model
+        # Initialize embedding model, shared by retrieval and ingest
         self.embed_model = OllamaEmbedding(
             model_name="nomic-embed-text",
-            base_url=self.ollama_base_url
+            base_url=self.ollama_base_url,
+            embed_batch_size=64
+        )
+
+        # Bounded cache so repeated queries (Streamlit reruns resubmit the
+        # same question) skip the embedding round-trip to Ollama
+        self._embed_query = functools.lru_cache(maxsize=256)(self._embed_query_uncached)
+
+        # Async Qdrant client, created lazily on first async retrieval
+        # (its gRPC channel binds to the running event loop)
+        self._async_qdrant_client = None
+
+    def _get_async_client(self) -> AsyncQdrantClient:
+        """Create the async Qdrant client on first use."""
+        if self._async_qdrant_client is None:
+            self._async_qdrant_client = AsyncQdrantClient(
+                host=self.qdrant_host,
+                port=self.qdrant_port,
+                grpc_port=self.qdrant_grpc_port,
+                prefer_grpc=True
+            )
+        return self._async_qdrant_client
+
+    def warm_up(self) -> None:
+        """
+        Force-load the embedding model into Ollama's memory with a throwaway
+        embedding call, so the first real retrieval doesn't pay the load cost.
+        """
+        try:
+            self.embed_model.get_text_embedding("warmup")
+        except Exception:
+            pass  # Ollama not reachable yet; first retrieval will load the model
+
+    def _embed_query_uncached(self, query: str) -> tuple:
+        """Embed a query string; returns a tuple so results are hashable/cacheable."""
+        return tuple(self.embed_model.get_text_embedding(query))
+
+    def _search_params(self) -> SearchParams:
+        """Search params shared by all retrieval paths: a small hnsw_ef sized
+        for low top_k, searching over the quantized vectors with oversampled
+        candidates rescored against the originals."""
+        return SearchParams(
+            hnsw_ef=self.hnsw_ef,
+            exact=False,
+            quantization=QuantizationSearchParams(
+                ignore=False,
+                rescore=True,
+                oversampling=2.0
+            )
         )
 
     def retrieve_context(self, query: str) -> str:
@@ -65,38 +158,217 @@ class RAGService:
             Formatted context string from top matching sections
         """
         try:
-            # Generate embedding for the query
-            query_embedding = self.embed_model.get_text_embedding(query)
+            # Generate embedding for the query (cached for repeat queries)
+            query_embedding = list(self._embed_query(query))
 
-            # Search Qdrant for similar sections
+            # Ranking pass: ids and scores only, no payloads on the wire
             search_results = self.qdrant_client.query_points(
                 collection_name=self.collection_name,
                 query=query_embedding,
                 limit=self.top_k,
-                with_payload=True
+                with_payload=False,
+                search_params=self._search_params()
+            )
+
+            # Fetch payloads once for the hits, then format
+            payloads = self._fetch_payloads(
+                [point.id for point in search_results.points]
             )
+            return self._format_context(search_results.points, payloads)
+
+        except Exception as e:
+            return f"Error retrieving context: {str(e)}"
 
-            # Format the retrieved context
-            if not search_results.points:
-                return "No relevant context found in the knowledge base."
+    def retrieve_context_batch(self, queries: List[str]) -> List[str]:
+        """
+        Retrieve context for several queries in a single Qdrant round-trip.
+
+        Useful for multi-query expansion or session-history re-queries:
+        the queries are embedded in one batched Ollama call, then searched
+        with one query_batch_points request instead of N serial searches.
 
-            context_parts = []
-            for i, point in enumerate(search_results.points, 1):
-                title = point.payload.get("title", "Untitled")
-                text = point.payload.get("text", "")
-                score = point.score
+        Args:
+            queries: List of user questions
 
-                context_parts.append(
-                    f"[Section {i} - Relevance: {score:.2f}]\n"
-                    f"Title: {title}\n"
-                    f"Content: {text}\n"
+        Returns:
+            Formatted context string for each query, in the same order
+        """
+        try:
+            query_embeddings = self.embed_model.get_text_embedding_batch(queries)
+
+            batch_requests = [
+                QueryRequest(
+                    query=embedding,
+                    limit=self.top_k,
+                    with_payload=False,
+                    params=self._search_params()
                 )
+                for embedding in query_embeddings
+            ]
+
+            responses = self.qdrant_client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=batch_requests
+            )
+
+            # Sub-queries over the same collection often hit overlapping
+            # chunks; fetch each unique payload once across all responses
+            unique_ids = {
+                point.id
+                for response in responses
+                for point in response.points
+            }
+            payloads = self._fetch_payloads(list(unique_ids))
 
-            return "\n".join(context_parts)
+            return [
+                self._format_context(response.points, payloads)
+                for response in responses
+            ]
+
+        except Exception as e:
+            return [f"Error retrieving context: {str(e)}"] * len(queries)
+
+    async def aretrieve_context(self, query: str) -> str:
+        """
+        Async variant of retrieve_context.
+
+        Embedding and search are both I/O-bound, so several users' retrievals
+        can be interleaved on one event loop without per-user threads.
+
+        Args:
+            query: User's question
+
+        Returns:
+            Formatted context string from top matching sections
+        """
+        try:
+            client = self._get_async_client()
+
+            query_embedding = await self.embed_model.aget_text_embedding(query)
+
+            search_results = await client.query_points(
+                collection_name=self.collection_name,
+                query=query_embedding,
+                limit=self.top_k,
+                with_payload=False,
+                search_params=self._search_params()
+            )
+
+            payloads = await self._afetch_payloads(
+                [point.id for point in search_results.points]
+            )
+            return self._format_context(search_results.points, payloads)
 
         except Exception as e:
             return f"Error retrieving context: {str(e)}"
 
+    async def aretrieve_context_batch(self, queries: List[str]) -> List[str]:
+        """
+        Async variant of retrieve_context_batch.
+
+        Embeds all queries concurrently with asyncio.gather, then issues a
+        single batched search and one payload fetch.
+
+        Args:
+            queries: List of user questions
+
+        Returns:
+            Formatted context string for each query, in the same order
+        """
+        try:
+            client = self._get_async_client()
+
+            query_embeddings = await asyncio.gather(
+                *(self.embed_model.aget_text_embedding(query) for query in queries)
+            )
+
+            batch_requests = [
+                QueryRequest(
+                    query=embedding,
+                    limit=self.top_k,
+                    with_payload=False,
+                    params=self._search_params()
+                )
+                for embedding in query_embeddings
+            ]
+
+            responses = await client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=batch_requests
+            )
+
+            unique_ids = {
+                point.id
+                for response in responses
+                for point in response.points
+            }
+            payloads = await self._afetch_payloads(list(unique_ids))
+
+            return [
+                self._format_context(response.points, payloads)
+                for response in responses
+            ]
+
+        except Exception as e:
+            return [f"Error retrieving context: {str(e)}"] * len(queries)
+
+    async def _afetch_payloads(self, point_ids: List) -> Dict:
+        """Async counterpart of _fetch_payloads."""
+        if not point_ids:
+            return {}
+
+        records = await self._get_async_client().retrieve(
+            collection_name=self.collection_name,
+            ids=list(point_ids),
+            with_payload=True,
+            with_vectors=False
+        )
+        return {record.id: record.payload for record in records}
+
+    def _fetch_payloads(self, point_ids: List) -> Dict:
+        """
+        Fetch payloads for the given point ids in a single retrieve call.
+
+        Args:
+            point_ids: Ids of the points to load payloads for
+
+        Returns:
+            Mapping of point id to payload
+        """
+        if not point_ids:
+            return {}
+
+        records = self.qdrant_client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(point_ids),
+            with_payload=True,
+            with_vectors=False
+        )
+        return {record.id: record.payload for record in records}
+
+    def _format_context(self, points, payloads: Dict) -> str:
+        """
+        Format search hits into the context string passed to the LLM.
+
+        Args:
+            points: Scored points returned by a Qdrant query
+            payloads: Mapping of point id to payload from _fetch_payloads
+
+        Returns:
+            Formatted context string from top matching sections
+        """
+        if not points:
+            return "No relevant context found in the knowledge base."
+
+        # Cap each chunk's text: fewer prompt tokens into the LLM means a
+        # proportionally faster first token and generation
+        return "\n".join(
+            f"[Section {i} - Relevance: {point.score:.2f}]\n"
+            f"Title: {(payloads.get(point.id) or {}).get('title', 'Untitled')}\n"
+            f"Content: {(payloads.get(point.id) or {}).get('text', '')[:self.max_chars_per_chunk]}\n"
+            for i, point in enumerate(points, 1)
+        )
+
     def check_connection(self) -> Dict[str, any]:
         """
         Check connection to Qdrant and verify collection exists.
@@ -131,10 +403,42 @@ class RAGService:
                 "error": str(e)
             }
 
+    def _load_embedding_cache(self) -> Dict[str, List[float]]:
+        """
+        Load persisted chunk embeddings keyed by content hash.
+
+        Returns:
+            Mapping of chunk sha1 to embedding (empty if no cache yet)
+        """
+        try:
+            with open(self.embedding_cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return {}  # No cache yet (or unreadable): embed everything
+
+    def _save_embedding_cache(self, cache: Dict[str, List[float]]) -> None:
+        """
+        Persist chunk embeddings for reuse by the next populate run.
+
+        Args:
+            cache: Mapping of chunk sha1 to embedding
+        """
+        try:
+            with open(self.embedding_cache_path, 'wb') as f:
+                pickle.dump(cache, f)
+        except Exception:
+            pass  # Cache dir may be read-only; caching is best-effort
+
+    # Sentinel marking the end of the parsed-section stream
+    _END_OF_SECTIONS = object()
+
     def populate_database(self, json_file_path: str) -> Dict[str, any]:
         """
         Populate Qdrant database with embeddings from fast_flow_extracted.json.
-        Uses semantic chunking to split sections into smaller, coherent pieces.
+        Streams the JSON with ijson so parsing overlaps with embedding instead
+        of materializing the whole file up front, and splits sections into
+        smaller chunks (sentence-based by default, optionally semantic for
+        long sections).
 
         Args:
             json_file_path: Path to fast_flow_extracted.json file
@@ -142,6 +446,11 @@ class RAGService:
         Returns:
             Dictionary with status, sections_processed, and chunks_created
         """
+        # Ingest-only imports, deferred off the module-import path
+        import ijson
+        from llama_index.core import Document
+        from llama_index.core.node_parser import SentenceSplitter
+
         try:
             # Step 1: Delete existing collection if it exists
             try:
@@ -151,88 +460,185 @@ class RAGService:
             except Exception:
                 pass  # Collection doesn't exist, that's fine
 
-            # Step 2: Create new collection
+            # Step 2: Create new collection with scalar int8 quantization:
+            # quantized vectors are 4x smaller, so the HNSW traversal reads
+            # far less memory per candidate; queries rescore against the
+            # original vectors to recover accuracy
             self.qdrant_client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(size=768, distance=Distance.COSINE)
+                vectors_config=VectorParams(
+                    size=768,
+                    distance=Distance.COSINE,
+                    on_disk=False
+                ),
+                quantization_config=ScalarQuantization(
+                    scalar=ScalarQuantizationConfig(
+                        type=ScalarType.INT8,
+                        quantile=0.99,
+                        always_ram=True
+                    )
+                )
             )
 
-            # Step 3: Load JSON data
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Step 4: Extract and filter sections
-            sections_data = []
-            for header in data:
-                for section in header["sections"]:
-                    title = section.get("tile", "").strip()
-                    content = section.get("content", "").strip()
-                    # Filter: non-empty title AND title != "Summary" AND has content
-                    if title and title != "Summary" and content:
-                        sections_data.append({"title": title, "text": content})
-
-            if not sections_data:
-                return {
-                    "success": False,
-                    "error": "No valid sections found in JSON file"
-                }
-
-            # Step 5: Initialize semantic splitter
-            ollama_embeddings = OllamaEmbedding(
-                model_name="nomic-embed-text",
-                base_url=self.ollama_base_url
+            # Step 3: Start a producer thread that streams filtered sections
+            # out of the JSON file while the main thread chunks and embeds,
+            # so parsing overlaps with the embedding round-trips
+            section_queue = queue.Queue(maxsize=256)
+            parse_errors = []
+
+            def parse_sections():
+                try:
+                    with open(json_file_path, 'rb') as f:
+                        for header in ijson.items(f, 'item'):
+                            for section in header["sections"]:
+                                title = section.get("tile", "").strip()
+                                content = section.get("content", "").strip()
+                                # Filter: non-empty title AND title != "Summary" AND has content
+                                if title and title != "Summary" and content:
+                                    section_queue.put({"title": title, "text": content})
+                except Exception as e:
+                    parse_errors.append(e)
+                finally:
+                    section_queue.put(self._END_OF_SECTIONS)
+
+            parser_thread = threading.Thread(target=parse_sections, daemon=True)
+            parser_thread.start()
+
+            # Step 4: Initialize splitters. The rule-based sentence splitter
+            # is purely local; the semantic splitter embeds every sentence
+            # boundary candidate against Ollama, so it's opt-in and only
+            # applied to long sections where coherence matters most
+            sentence_splitter = SentenceSplitter(
+                chunk_size=512,
+                chunk_overlap=64,
+                paragraph_separator="\n\n"
             )
-            splitter = SemanticSplitterNodeParser(
-                buffer_size=1,
-                breakpoint_percentile_threshold=70,
-                embed_model=ollama_embeddings
-            )
-
-            # Step 6: Process each section into semantic chunks
-            points = []
-            for index, section in enumerate(sections_data):
-                # Split section content into semantic nodes/chunks
-                nodes = splitter.get_nodes_from_documents(
-                    documents=[Document(text=section["text"])]
+            semantic_splitter = None
+            if self.use_semantic_chunking:
+                from llama_index.core.node_parser import SemanticSplitterNodeParser
+                semantic_splitter = SemanticSplitterNodeParser(
+                    buffer_size=1,
+                    breakpoint_percentile_threshold=70,
+                    embed_model=self.embed_model
                 )
-                chunks = [(node.embedding, node.get_content()) for node in nodes]
 
-                # Create point for each chunk
-                for inner_index, (_, content) in enumerate(chunks):
-                    # Skip empty chunks or chunks that are exactly "Summary"
-                    if not content.strip() or content.strip() == "Summary":
+            # Step 5: Generator that consumes sections in batches of ~64:
+            # split each into semantic chunks, filter before embedding so
+            # dropped chunks don't waste embed calls, then batch-embed and
+            # yield points as each batch completes, keeping peak memory at
+            # O(batch) instead of O(total chunks)
+            stats = {"sections_processed": 0, "chunks_created": 0}
+
+            # Embeddings persisted from previous runs, keyed by chunk
+            # content hash: unchanged chunks skip the embed call entirely
+            embedding_cache = self._load_embedding_cache()
+
+            def iter_points():
+                section_batch = []
+                done = False
+
+                while not done:
+                    section = section_queue.get()
+                    if section is self._END_OF_SECTIONS:
+                        done = True
+                    else:
+                        section_batch.append(section)
+
+                    if not section_batch or (not done and len(section_batch) < 64):
                         continue
 
-                    # Generate embedding for chunk
-                    emb = ollama_embeddings.get_text_embedding(content)
-
-                    # Create point with parent section's title
-                    point = PointStruct(
-                        id=index * 10 + inner_index,
-                        vector=emb,
-                        payload={
-                            "title": section["title"],
-                            "text": content  # Chunk content, not original section
-                        }
-                    )
-                    points.append(point)
+                    batch_chunks = []  # (title, content, chunk_hash)
+                    for section in section_batch:
+                        stats["sections_processed"] += 1
+                        splitter = (
+                            semantic_splitter
+                            if semantic_splitter is not None and len(section["text"]) > 4000
+                            else sentence_splitter
+                        )
+                        nodes = splitter.get_nodes_from_documents(
+                            documents=[Document(text=section["text"])]
+                        )
+                        for node in nodes:
+                            content = node.get_content()
+                            # Skip empty chunks or chunks that are exactly "Summary"
+                            if not content.strip() or content.strip() == "Summary":
+                                continue
+                            chunk_hash = hashlib.sha1(content.encode()).hexdigest()
+                            # The semantic splitter already embedded its nodes;
+                            # reuse that instead of re-embedding the same text
+                            if node.embedding is not None and chunk_hash not in embedding_cache:
+                                embedding_cache[chunk_hash] = node.embedding
+                            batch_chunks.append((section["title"], content, chunk_hash))
+                    section_batch = []
+
+                    if not batch_chunks:
+                        continue
+
+                    # Only embed chunks whose content hash isn't cached yet
+                    to_embed = [
+                        chunk for chunk in batch_chunks
+                        if chunk[2] not in embedding_cache
+                    ]
+                    if to_embed:
+                        embeddings = self.embed_model.get_text_embedding_batch(
+                            [content for _, content, _ in to_embed]
+                        )
+                        for (_, _, chunk_hash), emb in zip(to_embed, embeddings):
+                            embedding_cache[chunk_hash] = emb
+
+                    for title, content, chunk_hash in batch_chunks:
+                        stats["chunks_created"] += 1
+                        # Id derived from the (title, content) hash: unique
+                        # regardless of how many chunks a section produces
+                        # (the old index*10+inner scheme silently collided
+                        # past 10) and stable, so re-upserts are idempotent
+                        point_id = int(
+                            hashlib.sha1(f"{title}\x00{content}".encode()).hexdigest()[:15],
+                            16
+                        )
+                        yield PointStruct(
+                            id=point_id,
+                            vector=embedding_cache[chunk_hash],
+                            payload={
+                                "title": title,
+                                "text": content  # Chunk content, not original section
+                            }
+                        )
+
+                parser_thread.join()
+
+            # Step 6: Upload points to Qdrant in parallel batches with
+            # retries; the generator keeps the embed/upload pipeline flowing
+            self.qdrant_client.upload_points(
+                collection_name=self.collection_name,
+                points=iter_points(),
+                batch_size=256,
+                parallel=4,
+                max_retries=3
+            )
+
+            # Persist embeddings so the next run only embeds new/changed chunks
+            self._save_embedding_cache(embedding_cache)
 
-            if not points:
+            if parse_errors:
+                raise parse_errors[0]
+
+            if stats["sections_processed"] == 0:
                 return {
                     "success": False,
-                    "error": "No valid chunks created from sections"
+                    "error": "No valid sections found in JSON file"
                 }
 
-            # Step 7: Batch insert all points into Qdrant
-            self.qdrant_client.upsert(
-                collection_name=self.collection_name,
-                points=points
-            )
+            if stats["chunks_created"] == 0:
+                return {
+                    "success": False,
+                    "error": "No valid chunks created from sections"
+                }
 
             return {
                 "success": True,
-                "sections_processed": len(sections_data),
-                "chunks_created": len(points)
+                "sections_processed": stats["sections_processed"],
+                "chunks_created": stats["chunks_created"]
             }
 
         except Exception as e: